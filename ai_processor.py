@@ -1,7 +1,76 @@
+import atexit
 import datetime
-from openai import OpenAI
+import importlib.util
+import queue
+import re
+import threading
+import time
+import httpx
+from openai import OpenAI, DefaultHttpxClient
 from PySide6.QtCore import QObject, Signal, Slot
 
+def create_http_client():
+    """Creates a long-lived HTTP client (HTTP/2 when the optional h2 package is installed).
+    Idle connections are kept for 5 minutes so they survive the gap between hotkey presses."""
+    return DefaultHttpxClient(
+        http2=importlib.util.find_spec("h2") is not None,
+        timeout=httpx.Timeout(60.0, connect=5.0),
+        limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=300)
+    )
+
+# --- Background Log Writer ---
+LOG_FILE = 'openai_logs.txt'
+LOG_FLUSH_INTERVAL = 0.2  # Seconds between flushes of the buffered log file
+
+_log_queue = queue.Queue()
+_log_thread = None
+_log_thread_lock = threading.Lock()
+
+def _log_pump():
+    """Drains queued log entries into one buffered file handle, flushing periodically"""
+    with open(LOG_FILE, 'a', encoding='utf-8', buffering=1 << 17) as f:
+        last_flush = time.monotonic()
+        running = True
+        while running:
+            try:
+                parts = [_log_queue.get(timeout=LOG_FLUSH_INTERVAL)]
+            except queue.Empty:
+                parts = []
+            while True:
+                try:
+                    parts.append(_log_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in parts:  # Shutdown sentinel
+                running = False
+                parts = [part for part in parts if part is not None]
+            if parts:
+                f.write(''.join(parts))
+            now = time.monotonic()
+            if not running or now - last_flush >= LOG_FLUSH_INTERVAL:
+                f.flush()
+                last_flush = now
+
+def write_log(text):
+    """Queues text for the log file without blocking on disk I/O"""
+    global _log_thread
+    if _log_thread is None:
+        with _log_thread_lock:
+            if _log_thread is None:
+                _log_thread = threading.Thread(target=_log_pump, name="clueme-log", daemon=True)
+                _log_thread.start()
+    _log_queue.put(text)
+
+@atexit.register
+def flush_logs():
+    """Writes out any queued log entries before the process exits"""
+    if _log_thread is not None and _log_thread.is_alive():
+        _log_queue.put(None)
+        _log_thread.join(timeout=2)
+
+# Three or more consecutive line breaks (blank lines may hold whitespace)
+_BLANK_LINES_RE = re.compile(r"\n\s*\n\s*\n+")
+
 class SignalEmitter(QObject):
     """Signal emitter for AI processing events"""
     quit_signal = Signal()
@@ -9,25 +78,66 @@ class SignalEmitter(QObject):
     response_finished = Signal()
     error_occurred = Signal(str)
     processing_started = Signal()
-    extraction_complete = Signal(dict)
 
 class AIProcessor:
     """Handles all AI-related processing"""
     
-    def __init__(self, api_key, base_url, smarter_model="gpt-4"):
-        """Initialize the AI processor with API configuration"""
+    # Streamed deltas are emitted in batches that start at 1 and grow x3 up to 50
+    STREAM_BATCH_GROWTH = 3
+    STREAM_BATCH_MAX = 50
+    
+    # Upper bound on extracted question text sent to the model (keeps prompt tokens bounded)
+    MAX_QUESTION_CHARS = 4000
+    
+    # Prompt text is built once; only the question and choices vary per call
+    _SYSTEM_PROMPT = "You are a helpful AI assistant specializing in answering MCQs concisely."
+    _CONTEXT_TEMPLATE = "Context from extraction:\nQuestion: {question}\nChoices:\n{choices}"
+    _ANSWER_TEMPLATE = """
+            You are an expert AI assistant. Answer the following multiple-choice question and provide a brief explanation for your choice.
+            Limit your total response (answer + explanation) to approximately 700 characters.
+            Be concise and clear. State the correct choice first, then the explanation.
+
+            Question:
+            {question}
+
+            Choices:
+            {choices}
+
+            Your Answer (Correct Choice + Brief Explanation):
+            """
+    
+    def __init__(self, api_key, base_url, smarter_model="gpt-4", http_client=None):
+        """Initialize the AI processor with API configuration.
+        Pass http_client to share a connection pool with other clients."""
         self.api_key = api_key
         self.base_url = base_url
         self.smarter_model = smarter_model
         
-        # Create client for the smarter model
+        # Create client for the smarter model on a persistent connection pool
         self.client = OpenAI(
             api_key=api_key,
-            base_url=base_url
+            base_url=base_url,
+            http_client=http_client if http_client is not None else create_http_client()
         )
         
         self.emitter = SignalEmitter()
         
+    def warm_up(self):
+        """Opens the connection to the solving endpoint ahead of the first question"""
+        try:
+            self.client.models.list()
+            print("Solving model connection warmed up.")
+        except Exception as e:
+            print(f"Solving model warm-up failed (first question will connect instead): {e}")
+        
+    def _trim_question(self, question):
+        """Collapses runs of blank lines and caps the question length; indentation is kept for code"""
+        question = _BLANK_LINES_RE.sub("\n\n", question.strip())
+        if len(question) > self.MAX_QUESTION_CHARS:
+            print(f"Question text truncated from {len(question)} to {self.MAX_QUESTION_CHARS} characters.")
+            question = question[:self.MAX_QUESTION_CHARS]
+        return question
+        
     def process_question(self, extracted_data):
         """Process a question using the AI model"""
         if not extracted_data.get("question_found"):
@@ -42,7 +152,7 @@ class AIProcessor:
             self.emitter.response_finished.emit()
             return
 
-        question = extracted_data["question"]
+        question = self._trim_question(extracted_data["question"])
         choices = extracted_data["choices"]
 
         print(f"\n--- Answering MCQ using {self.smarter_model} ---")
@@ -51,27 +161,15 @@ class AIProcessor:
 
         try:
             # --- Get Answer and Explanation ---
-            answering_prompt = f"""
-            You are an expert AI assistant. Answer the following multiple-choice question and provide a brief explanation for your choice.
-            Limit your total response (answer + explanation) to approximately 700 characters.
-            Be concise and clear. State the correct choice first, then the explanation.
-
-            Question:
-            {question}
-
-            Choices:
-            {chr(10).join(f'- {choice}' for choice in choices)}
-
-            Your Answer (Correct Choice + Brief Explanation):
-            """
-
-            context_content = f"Context from extraction:\nQuestion: {question}\nChoices:\n" + "\n".join(f"- {choice}" for choice in choices)
+            choices_list = "\n".join(f"- {choice}" for choice in choices)
+            answering_prompt = self._ANSWER_TEMPLATE.format(question=question, choices=choices_list)
+            context_content = self._CONTEXT_TEMPLATE.format(question=question, choices=choices_list)
 
             stream = self.client.chat.completions.create(
                 model=self.smarter_model,
                 messages=[
                     {"role": "system", "content": context_content},
-                    {"role": "system", "content": "You are a helpful AI assistant specializing in answering MCQs concisely."},
+                    {"role": "system", "content": self._SYSTEM_PROMPT},
                     {"role": "user", "content": answering_prompt}
                 ],
                 stream=True,
@@ -79,20 +177,29 @@ class AIProcessor:
             )
 
             full_response_content = ""
+            pending = []
+            batch_size = 1
             for chunk in stream:
                 content_chunk = chunk.choices[0].delta.content
                 if content_chunk is not None:
                     full_response_content += content_chunk
-                    self.emitter.response_chunk_received.emit(content_chunk)
+                    pending.append(content_chunk)
+                    if len(pending) >= batch_size:
+                        self.emitter.response_chunk_received.emit("".join(pending))
+                        pending.clear()
+                        batch_size = min(self.STREAM_BATCH_MAX, batch_size * self.STREAM_BATCH_GROWTH)
+            if pending:
+                self.emitter.response_chunk_received.emit("".join(pending))
 
             self.emitter.response_finished.emit()
 
-            with open('openai_logs.txt', 'a', encoding='utf-8') as f:
-                f.write(f"\n\n=== {datetime.datetime.now().isoformat()} ===\n")
-                f.write(f"Extracted Question:\n{question}\n")
-                f.write(f"Extracted Choices:\n{choices}\n\n")
-                f.write(f"Answering Prompt (User):\n{answering_prompt}\n\n")
-                f.write(f"Response (Smarter Model):\n{full_response_content}\n")
+            write_log(
+                f"\n\n=== {datetime.datetime.now().isoformat()} ===\n"
+                f"Extracted Question:\n{question}\n"
+                f"Extracted Choices:\n{choices}\n\n"
+                f"Answering Prompt (User):\n{answering_prompt}\n\n"
+                f"Response (Smarter Model):\n{full_response_content}\n"
+            )
 
             print(f"Full OpenAI response logged. Length: {len(full_response_content)}")
 
@@ -1,21 +1,27 @@
 import sys
 import ctypes
+from ctypes import wintypes
 import os
 import datetime
 import json
 import platform
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from PIL import ImageGrab
 
 import ocr
-from ai_processor import AIProcessor
+from ai_processor import AIProcessor, create_http_client, write_log
 
 # Import from PySide6 instead of PyQt6
-from PySide6.QtWidgets import QApplication, QWidget, QLabel, QVBoxLayout, QSizePolicy
-from PySide6.QtCore import Qt, QObject, Signal, QThread, Slot
+from PySide6.QtWidgets import QApplication, QWidget, QTextEdit, QFrame, QVBoxLayout, QSizePolicy
+from PySide6.QtCore import Qt, QTimer, Slot, QAbstractNativeEventFilter, QByteArray
+from PySide6.QtGui import QTextCursor
 from global_hotkeys import register_hotkeys, start_checking_hotkeys, stop_checking_hotkeys
 
 # Windows version detection
+@functools.lru_cache(maxsize=1)
 def get_windows_version():
     """Get Windows major and minor version numbers"""
     if platform.system() != 'Windows':
@@ -31,6 +37,7 @@ def get_windows_version():
         return None
 
 # Check if Windows 10 version 2004 or higher (build 19041+) or Windows 11
+@functools.lru_cache(maxsize=1)
 def is_win10_2004_or_higher():
     ver = get_windows_version()
     if not ver:
@@ -46,6 +53,10 @@ def is_win10_2004_or_higher():
     
     return False
 
+# Resolved once; the OS version cannot change while the process runs
+WIN_VER = get_windows_version()
+IS_WIN10_2004_PLUS = is_win10_2004_or_higher()
+
 def is_frozen():
     """Check if running as a compiled executable (Nuitka)"""
     return getattr(sys, 'frozen', False)
@@ -100,6 +111,9 @@ def load_env_settings():
 # Load environment variables
 load_env_settings()
 
+# Start writing OCR diagnostics (queued by the ocr module) to the console and ocr.log
+ocr.start_logging()
+
 # --- Display Selected OCR Engine ---
 print(f"Using OCR Engine: GEMINI")
 
@@ -113,6 +127,9 @@ CAPTURE_HOTKEY = os.getenv("CAPTURE_HOTKEY", "Alt+Enter")
 QUIT_HOTKEY = os.getenv("QUIT_HOTKEY", "Ctrl+Alt+Q")
 RESET_HOTKEY = os.getenv("RESET_HOTKEY", "Ctrl+Alt+R")
 
+# Capture only the foreground window instead of the whole desktop (Windows only)
+CAPTURE_ACTIVE_WINDOW = os.getenv("CAPTURE_ACTIVE_WINDOW", "true").lower() in ("1", "true", "yes")
+
 def parse_hotkey(hotkey_str):
     """Parse a hotkey string like 'Ctrl+Alt+R' into a list of modifiers and key."""
     parts = hotkey_str.lower().split('+')
@@ -134,6 +151,7 @@ print(f"Answering Model: {SOLVING_MODEL}")
 print(f"Capture Hotkey: {CAPTURE_HOTKEY}")
 print(f"Quit Hotkey: {QUIT_HOTKEY}")
 print(f"Reset Hotkey: {RESET_HOTKEY}")
+print(f"Capture Active Window Only: {CAPTURE_ACTIVE_WINDOW}")
 
 # Initialize the client
 if not SOLVING_MODEL_API_KEY:
@@ -169,30 +187,49 @@ if not SOLVING_MODEL_API_KEY:
         # Exit the application
         sys.exit(1)
 
+# One connection pool shared by the OCR and solving clients
+http_client = create_http_client()
+ocr.set_http_client(http_client)
+
 # Create AI processor
 ai_processor = AIProcessor(
     api_key=SOLVING_MODEL_API_KEY,
     base_url=SOLVING_MODEL_BASE_URL,
-    smarter_model=SOLVING_MODEL
+    smarter_model=SOLVING_MODEL,
+    http_client=http_client
 )
 
-# --- Worker Thread for AI Calls ---
-class AIWorker(QObject):
-    @Slot(dict)
-    def run_answering(self, extracted_data):
-        """Runs the AI step (answering) if a question was found."""
-        ai_processor.process_question(extracted_data)
+# --- Worker Pool for Capture and AI Calls ---
+# Results reach the UI through the emitter's signals, which are queued across threads
+_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="clueme")
+
+def capture_then_process():
+    """Runs screen capture, OCR and the AI step (answering) on a pool thread."""
+    global is_processing
+    try:
+        extracted_data = capture_and_extract()
+        if extracted_data is not None:
+            ai_processor.process_question(extracted_data)
+    except Exception as e:
+        # Futures swallow exceptions, so surface them here
+        print(f"Unexpected error in worker: {e}")
+        ai_processor.emitter.error_occurred.emit(f"Unexpected error: {e}")
+        is_processing = False
+
+def warm_up():
+    """Primes the OCR and solving clients so the first capture skips connection setup."""
+    ocr.warm_up()
+    ai_processor.warm_up()
 
 # --- PySide6 UI Setup ---
 app = QApplication(sys.argv)
 widget = QWidget()
 
 # Window Styling - Different approach based on Windows version
-windows_version = get_windows_version()
-print(f"Detected Windows version: {windows_version if windows_version else 'Non-Windows OS'}")
+print(f"Detected Windows version: {WIN_VER if WIN_VER else 'Non-Windows OS'}")
 
 # Use different window flags depending on Windows version
-if is_win10_2004_or_higher():
+if IS_WIN10_2004_PLUS:
     # For Windows 10 version 2004+ and Windows 11, we can use FramelessWindowHint safely
     print("Using FramelessWindowHint (Windows 10 v2004+ or Windows 11 detected)")
     widget.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.WindowStaysOnTopHint | Qt.WindowType.Tool | Qt.WindowType.WindowTransparentForInput)
@@ -211,43 +248,136 @@ QWidget {
     background-color: black;
     border-radius: 15px;
 }
-QLabel {
-    padding: 20px;
+QTextEdit {
+    background-color: transparent;
+    border: none;
     color: white;
     font-size: 16px;
 }
 """)
 
-label = QLabel("Press " + CAPTURE_HOTKEY + " to capture screen and get AI response\nPress " + QUIT_HOTKEY + " to quit")
-label.setWordWrap(True)
-label.setAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop)
-label.setMinimumWidth(600)
-label.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+IDLE_TEXT = "Press " + CAPTURE_HOTKEY + " to capture screen and get AI response\nPress " + QUIT_HOTKEY + " to quit"
+
+# Read-only QTextEdit so streamed chunks can be appended incrementally
+text_display = QTextEdit()
+text_display.setReadOnly(True)
+text_display.setFrameShape(QFrame.Shape.NoFrame)
+text_display.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+text_display.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+text_display.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+text_display.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+text_display.document().setDocumentMargin(20)
+text_display.setMinimumWidth(600)
+text_display.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+text_display.setPlainText(IDLE_TEXT)
 
 layout = QVBoxLayout()
 layout.setContentsMargins(15, 15, 15, 15)
-layout.addWidget(label)
+layout.addWidget(text_display)
 widget.setLayout(layout)
 
 # --- UI Positioning ---
+# Screen geometry and width are fixed once; only the height follows the content
+screen_rect = app.primaryScreen().geometry()
+widget.setFixedWidth(min(800, screen_rect.width() - 60))
+widget_x = (screen_rect.width() - widget.width()) // 2
+widget_y = 30
+HEIGHT_BUCKET = 20  # Only resize when the content height crosses a 20px bucket
+
+def content_height():
+    """Height the widget needs to show the whole document at the fixed width."""
+    margins = layout.contentsMargins()
+    doc = text_display.document()
+    text_width = widget.width() - margins.left() - margins.right()
+    if doc.textWidth() != text_width:
+        doc.setTextWidth(text_width)
+    return int(doc.size().height()) + margins.top() + margins.bottom()
+
 def position_widget():
-    screen = app.primaryScreen().geometry()
-    widget.adjustSize()
-    max_height = screen.height() * 0.6
-    if widget.height() > max_height:
-        widget.setFixedHeight(int(max_height))
-    
-    x = (screen.width() - widget.width()) // 2
-    y = 30
-    widget.move(x, y)
+    max_height = int(screen_rect.height() * 0.6)
+    content_height_px = content_height()
+    # Round up to the next bucket so text is never clipped between resizes
+    target_height = -(-content_height_px // HEIGHT_BUCKET) * HEIGHT_BUCKET
+    target_height = max(widget.minimumHeight(), min(target_height, max_height))
+    if target_height != widget.height():
+        widget.resize(widget.width(), target_height)
+    widget.move(widget_x, widget_y)
 
 position_widget()  # Initial position
 
+# --- Render Timer ---
+# Streamed chunks only mark the layout as dirty; geometry is refreshed on this tick
+needs_layout = False
+
+def refresh_layout():
+    global needs_layout
+    if needs_layout:
+        needs_layout = False
+        position_widget()
+
+render_timer = QTimer()
+render_timer.setInterval(50)
+render_timer.timeout.connect(refresh_layout)
+
 # --- Screen Capture ---
+MIN_CAPTURE_SIZE = 200  # Smaller (or minimized) foreground windows fall back to a full grab
+overlay_hwnd = None  # Native handle of the overlay, set once the window is shown
+DWMWA_EXTENDED_FRAME_BOUNDS = 9
+MONITOR_DEFAULTTONEAREST = 2
+MONITORINFOF_PRIMARY = 1
+
+class MONITORINFO(ctypes.Structure):
+    _fields_ = [("cbSize", wintypes.DWORD), ("rcMonitor", wintypes.RECT),
+                ("rcWork", wintypes.RECT), ("dwFlags", wintypes.DWORD)]
+
+def get_foreground_window_rect():
+    """
+    Returns ((left, top, right, bottom), on_primary) for the foreground window clipped to
+    its monitor, or None to grab the full screen.
+    """
+    if not CAPTURE_ACTIVE_WINDOW or WIN_VER is None:
+        return None
+    try:
+        user32 = ctypes.windll.user32
+        hwnd = user32.GetForegroundWindow()
+        # Our own overlay is excluded from capture, so cropping to it would give a blank image
+        if not hwnd or hwnd == overlay_hwnd:
+            return None
+        rect = wintypes.RECT()
+        # GetWindowRect includes the invisible DWM resize border; the extended frame bounds do not
+        if ctypes.windll.dwmapi.DwmGetWindowAttribute(
+                wintypes.HWND(hwnd), DWMWA_EXTENDED_FRAME_BOUNDS, ctypes.byref(rect), ctypes.sizeof(rect)) != 0:
+            if not user32.GetWindowRect(hwnd, ctypes.byref(rect)):
+                return None
+        
+        # Clip to the window's monitor so maximized or overhanging windows don't pick up
+        # black padding or part of the neighbouring screen
+        user32.MonitorFromWindow.restype = wintypes.HMONITOR
+        user32.GetMonitorInfoW.argtypes = [wintypes.HMONITOR, ctypes.POINTER(MONITORINFO)]
+        monitor = user32.MonitorFromWindow(wintypes.HWND(hwnd), MONITOR_DEFAULTTONEAREST)
+        info = MONITORINFO(cbSize=ctypes.sizeof(MONITORINFO))
+        if not monitor or not user32.GetMonitorInfoW(monitor, ctypes.byref(info)):
+            return None
+        bounds = info.rcMonitor
+        left, top = max(rect.left, bounds.left), max(rect.top, bounds.top)
+        right, bottom = min(rect.right, bounds.right), min(rect.bottom, bounds.bottom)
+        if right - left < MIN_CAPTURE_SIZE or bottom - top < MIN_CAPTURE_SIZE:
+            return None
+        return (left, top, right, bottom), bool(info.dwFlags & MONITORINFOF_PRIMARY)
+    except Exception as e:
+        print(f"Could not get foreground window rect, capturing full screen: {e}")
+        return None
+
 def capture_screen():
     """Captures the screen and performs OCR using Gemini Vision."""
     try:
-        screenshot_pil = ImageGrab.grab()
+        window = get_foreground_window_rect()
+        if window:
+            bbox, on_primary = window
+            # all_screens grabs the whole virtual desktop and then crops, so only use it off the primary monitor
+            screenshot_pil = ImageGrab.grab(bbox=bbox, all_screens=not on_primary)
+        else:
+            screenshot_pil = ImageGrab.grab()
         print("Screenshot grabbed. Performing OCR with Gemini Vision...")
         
         # Call the perform_ocr function from the ocr module
@@ -263,10 +393,11 @@ def capture_screen():
         # Log the captured text
         print(f"Captured text (first 200 chars): {text[:200]}")
         # Log full OCR text to file
-        with open('openai_logs.txt', 'a', encoding='utf-8') as f:
-            f.write(f"\n\n=== OCR TEXT (GEMINI) {datetime.datetime.now().isoformat()} ===\n")
-            f.write(text)
-            f.write("\n=== END OCR TEXT ===\n")
+        write_log(
+            f"\n\n=== OCR TEXT (GEMINI) {datetime.datetime.now().isoformat()} ===\n"
+            f"{text}"
+            "\n=== END OCR TEXT ===\n"
+        )
         
         return text
         
@@ -278,72 +409,65 @@ def capture_screen():
 
 # --- Global State ---
 is_processing = False  # Flag to prevent concurrent processing
-is_first_chunk = True  # Flag for clearing label on first chunk of Step 2
+last_capture_time = 0.0  # time.monotonic() of the last accepted capture hotkey press
+CAPTURE_DEBOUNCE_SECONDS = 1.0  # Presses closer together than this are ignored (key auto-repeat)
+is_first_chunk = True  # Flag for clearing the display on first chunk of Step 2
 
 # --- UI Update Slots ---
 @Slot(str)
-def update_label_chunk(chunk):
-    global is_first_chunk
+def update_text_chunk(chunk):
+    global is_first_chunk, needs_layout
     if is_first_chunk:
-        label.setText("")
+        text_display.clear()
         is_first_chunk = False
     
-    current_text = label.text()
-    label.setText(current_text + chunk)
-    position_widget()
+    # Insert at the end so Qt only lays out the new text, not the whole document
+    cursor = text_display.textCursor()
+    cursor.movePosition(QTextCursor.MoveOperation.End)
+    cursor.insertText(chunk)
+    text_display.setTextCursor(cursor)
+    needs_layout = True
 
 @Slot()
 def handle_response_finished():
     global is_processing
     print("Processing finished.")
     is_processing = False
+    render_timer.stop()
     position_widget()
 
 @Slot(str)
 def handle_error(error_message):
     global is_processing
     print(f"Displaying error: {error_message}")
-    label.setText(f"Error:\n{error_message}")
+    text_display.setPlainText(f"Error:\n{error_message}")
     is_processing = False
+    render_timer.stop()
     position_widget()
 
 @Slot()
 def show_thinking():
     global is_first_chunk
     is_first_chunk = True
-    label.setText("Thinking...")
+    text_display.setPlainText("Thinking...")
     position_widget()
+    render_timer.start()
 
-# --- Hotkey Callbacks ---
-def process_screen_callback():
+# --- Extraction ---
+def capture_and_extract():
+    """Captures the screen and parses the extracted MCQ. Returns None on failure."""
     global is_processing
-    if is_processing:
-        print("Already processing, ignoring hotkey press.")
-        return
-    
-    print("Capture Hotkey pressed!")
-    is_processing = True
-    ai_processor.emitter.processing_started.emit()
     
     # Perform screen capture and OCR
     text = capture_screen()
     
     if text:
         try:
-            # Parse the JSON response from Gemini
-            extracted_data = json.loads(text)
-            # Basic validation
-            if not isinstance(extracted_data.get("question_found"), bool):
-                raise ValueError("Invalid 'question_found' field")
-            if extracted_data.get("question_found"):
-                if not isinstance(extracted_data.get("question"), str) or not isinstance(extracted_data.get("choices"), list):
-                    raise ValueError("Missing or invalid 'question' or 'choices' when question_found is true")
-                # Further validation: ensure choices are strings
-                if not all(isinstance(item, str) for item in extracted_data.get("choices", [])):
-                    raise ValueError("Not all items in 'choices' are strings")
+            # Parse and validate the JSON response from Gemini
+            extracted_data = ocr.parse_extraction(text)
 
             print(f"Parsed Extraction Data: {extracted_data}")
-            ai_processor.emitter.extraction_complete.emit(extracted_data)  # Emit result directly to answering step
+            return extracted_data
 
         except json.JSONDecodeError:
             print("Error: Gemini did not return valid JSON for extraction.")
@@ -356,6 +480,26 @@ def process_screen_callback():
     else:
         # Handle OCR failure immediately (error signal already emitted)
         is_processing = False  # Reset processing flag
+    return None
+
+# --- Hotkey Callbacks ---
+def process_screen_callback():
+    global is_processing, last_capture_time
+    if is_processing:
+        print("Already processing, ignoring hotkey press.")
+        return
+    
+    now = time.monotonic()
+    if now - last_capture_time < CAPTURE_DEBOUNCE_SECONDS:
+        print("Capture hotkey pressed again too soon, ignoring.")
+        return
+    last_capture_time = now
+    
+    print("Capture Hotkey pressed!")
+    is_processing = True
+    ai_processor.emitter.processing_started.emit()
+    # Capture and OCR run on the pool so neither the UI nor the hotkey listener blocks
+    _pool.submit(capture_then_process)
 
 def trigger_quit_from_hotkey():
     print("Quit Hotkey pressed!")
@@ -369,12 +513,8 @@ def perform_quit():
     except Exception as e:
         print(f"Error stopping global_hotkeys: {e}")
     
-    # Ensure thread is properly cleaned up
-    if thread.isRunning():
-        print("Waiting for worker thread to finish...")
-        thread.quit()
-        thread.wait()  # Wait for thread to finish
-        print("Worker thread finished.")
+    # Drop queued work; an in-flight request finishes on its own
+    _pool.shutdown(wait=False, cancel_futures=True)
     
     app.quit()
 
@@ -387,33 +527,16 @@ def reset_program():
     print("Reset Hotkey pressed!")
     is_first_chunk = True
     is_processing = False
-    label.setText("Press " + CAPTURE_HOTKEY + " to capture screen and get AI response\nPress " + QUIT_HOTKEY + " to quit")
+    text_display.setPlainText(IDLE_TEXT)
     position_widget()
 
 # --- Signal/Slot Connections ---
 ai_processor.emitter.processing_started.connect(show_thinking)
-ai_processor.emitter.response_chunk_received.connect(update_label_chunk)
+ai_processor.emitter.response_chunk_received.connect(update_text_chunk)
 ai_processor.emitter.response_finished.connect(handle_response_finished)
 ai_processor.emitter.error_occurred.connect(handle_error)
 ai_processor.emitter.quit_signal.connect(perform_quit)
 
-# --- Setup Worker Thread ---
-thread = QThread()
-worker = AIWorker()
-worker.moveToThread(thread)
-
-ai_processor.emitter.extraction_complete.connect(worker.run_answering)
-
-thread.started.connect(lambda: print("Worker thread started."))
-thread.finished.connect(lambda: print("Worker thread finished."))
-ai_processor.emitter.quit_signal.connect(thread.quit)
-ai_processor.emitter.quit_signal.connect(worker.deleteLater)
-
-# Use wait() for proper thread termination before app exit
-ai_processor.emitter.quit_signal.connect(thread.wait)
-
-thread.start()  # Start the thread event loop
-
 # --- Register Hotkeys ---
 hotkeys_bindings = [
     { "key": CAPTURE_HOTKEY, "callback": process_screen_callback },
@@ -431,24 +554,113 @@ for binding in hotkeys_bindings:
     except Exception as e:
         print(f"Error parsing or registering hotkey '{binding['key']}': {e}")
 
-if registered_hotkeys:
-    try:
-        register_hotkeys(registered_hotkeys)
-        start_checking_hotkeys()
-        print("Hotkey listener started.")
-    except Exception as e:
-        print(f"Failed to start hotkey listener: {e}")
-        sys.exit(1)  # Consider exiting if hotkeys fail
-else:
+if not registered_hotkeys:
     print("No valid hotkeys registered. Exiting.")
     sys.exit(1)
 
+# --- Native Hotkeys (Windows) ---
+WM_HOTKEY = 0x0312
+MOD_NOREPEAT = 0x4000
+HOTKEY_MODIFIER_FLAGS = {'alt': 0x0001, 'control': 0x0002, 'shift': 0x0004, 'win': 0x0008}
+HOTKEY_VIRTUAL_KEYS = {
+    'enter': 0x0D, 'space': 0x20, 'tab': 0x09, 'escape': 0x1B, 'esc': 0x1B, 'backspace': 0x08,
+    'insert': 0x2D, 'delete': 0x2E, 'home': 0x24, 'end': 0x23, 'page_up': 0x21, 'page_down': 0x22,
+    'left': 0x25, 'up': 0x26, 'right': 0x27, 'down': 0x28,
+}
+
+def hotkey_virtual_key(key):
+    """Map a parsed key name to a Windows virtual-key code, or None if it has no mapping."""
+    if key in HOTKEY_VIRTUAL_KEYS:
+        return HOTKEY_VIRTUAL_KEYS[key]
+    if len(key) == 1 and key.isalnum():
+        return ord(key.upper())
+    if key.startswith('f') and key[1:].isdigit() and 1 <= int(key[1:]) <= 24:
+        return 0x70 + int(key[1:]) - 1
+    return None
+
+class NativeHotkeyFilter(QAbstractNativeEventFilter):
+    """
+    Dispatches WM_HOTKEY messages posted to the GUI thread to their callbacks.
+    Only installed on Windows once a hotkey is registered; it sees every native message.
+    """
+    def __init__(self):
+        super().__init__()
+        self.callbacks = {}
+        # Resolved once so the per-message path is just the two comparisons
+        self._event_type = QByteArray(b"windows_generic_MSG")
+        self._msg_at = wintypes.MSG.from_address
+
+    def nativeEventFilter(self, event_type, message):
+        if event_type == self._event_type:
+            msg = self._msg_at(int(message))
+            if msg.message == WM_HOTKEY:
+                callback = self.callbacks.get(msg.wParam)
+                if callback:
+                    callback()
+                    return True, 0
+        return False, 0
+
+native_hotkeys = NativeHotkeyFilter()
+
+def register_native_hotkey(hotkey_id, hotkey_definition, callback):
+    """Register a hotkey with RegisterHotKey on the calling (GUI) thread. Returns False if it cannot."""
+    if WIN_VER is None:
+        return False
+    vk = hotkey_virtual_key(hotkey_definition[-1])
+    if vk is None:
+        return False
+    flags = MOD_NOREPEAT
+    for modifier in hotkey_definition[:-1]:
+        flags |= HOTKEY_MODIFIER_FLAGS[modifier]
+    try:
+        if not ctypes.windll.user32.RegisterHotKey(None, hotkey_id, flags, vk):
+            print(f"RegisterHotKey failed for {hotkey_definition} (error {ctypes.windll.kernel32.GetLastError()})")
+            return False
+    except Exception as e:
+        print(f"Error in RegisterHotKey: {e}")
+        return False
+    native_hotkeys.callbacks[hotkey_id] = callback
+    return True
+
+def unregister_native_hotkeys():
+    for hotkey_id in list(native_hotkeys.callbacks):
+        try:
+            ctypes.windll.user32.UnregisterHotKey(None, hotkey_id)
+        except Exception as e:
+            print(f"Error in UnregisterHotKey: {e}")
+    native_hotkeys.callbacks.clear()
+
+# --- Deferred Startup ---
+def _post_show_init():
+    """Registers hotkeys and starts warm-up once the event loop is running."""
+    # Native hotkeys cost nothing between presses; anything RegisterHotKey rejects
+    # (unmapped key, combo owned by another app) falls back to the polling listener
+    fallback_hotkeys = [
+        binding for hotkey_id, binding in enumerate(registered_hotkeys, start=1)
+        if not register_native_hotkey(hotkey_id, binding[0], binding[1])
+    ]
+    print(f"Registered {len(native_hotkeys.callbacks)} native hotkey(s).")
+    if native_hotkeys.callbacks:
+        app.installNativeEventFilter(native_hotkeys)
+    if fallback_hotkeys:
+        try:
+            register_hotkeys(fallback_hotkeys)
+            start_checking_hotkeys()
+            print("Hotkey listener started.")
+        except Exception as e:
+            print(f"Failed to start hotkey listener: {e}")
+            app.exit(1)  # Consider exiting if hotkeys fail
+            return
+    _pool.submit(warm_up)
+
 # --- Show Window and Run App ---
 widget.show()
+# Display affinity stays synchronous so the overlay is never capturable, even for a frame
 try:
     hwnd = widget.winId()
     # Make sure we get a valid window handle
     if hwnd:
+        overlay_hwnd = int(hwnd)
         # Apply SetWindowDisplayAffinity with proper error handling
         try:
             result = ctypes.windll.user32.SetWindowDisplayAffinity(int(hwnd), 0x00000011)  # DWMWA_EXCLUDED_FROM_CAPTURE
@@ -459,7 +671,7 @@ try:
                 print(f"Failed to set window display affinity. Error code: {error_code}")
                 
                 # Try an alternative approach if the current Windows version needs it
-                if not is_win10_2004_or_higher():
+                if not IS_WIN10_2004_PLUS:
                     print("Trying alternative approach for older Windows versions...")
                     # For older Windows versions, we may need to recreate the window
                     # or use a different attribute
@@ -470,8 +682,10 @@ try:
 except Exception as e:
     print(f"Could not set window display affinity (might be normal on non-Windows): {e}")
 
+QTimer.singleShot(0, _post_show_init)
 exit_code = app.exec()
 print("Application exiting.")
+unregister_native_hotkeys()
 if registered_hotkeys:
     try:
         print("Stopping hotkey listener...")
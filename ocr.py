@@ -1,12 +1,53 @@
 import os
 import sys
 import time
+import atexit
 import base64
+import hashlib
 import io
+import json
+import logging
+import queue
+import re
+import threading
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from PIL import Image
-from openai import OpenAI
 from dotenv import load_dotenv
 
+# --- Logging ---
+# Records are only enqueued on the calling thread; a QueueListener does the actual I/O
+OCR_LOG_FILE = 'ocr.log'
+
+log = logging.getLogger("clueme.ocr")
+log.setLevel(logging.INFO)
+log.propagate = False
+_log_queue = queue.SimpleQueue()
+log.addHandler(QueueHandler(_log_queue))
+_log_listener = None
+
+def start_logging():
+    """Starts the background listener writing OCR log records to the console and ocr.log."""
+    global _log_listener
+    if _log_listener is not None:
+        return
+    handlers = [RotatingFileHandler(OCR_LOG_FILE, maxBytes=10_000_000, backupCount=1, encoding='utf-8', delay=True)]
+    if sys.stdout is not None:  # No console in --noconsole builds
+        handlers.append(logging.StreamHandler(sys.stdout))
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    _log_listener = QueueListener(_log_queue, *handlers)
+    _log_listener.start()
+
+@atexit.register
+def stop_logging():
+    """Flushes pending OCR log records and stops the listener."""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
 def is_frozen():
     """Check if running as a compiled executable (Nuitka)"""
     return getattr(sys, 'frozen', False)
@@ -26,11 +67,11 @@ def load_env_settings():
     env_path = os.path.join(base_dir, '.env')
     
     if os.path.exists(env_path):
-        print(f"Loading settings from: {env_path}")
+        log.info(f"Loading settings from: {env_path}")
         load_dotenv(env_path)
     else:
-        print(f"Warning: .env file not found at {env_path}")
-        print("Using default settings or environment variables")
+        log.warning(f".env file not found at {env_path}")
+        log.info("Using default settings or environment variables")
 
 # Load environment variables
 load_env_settings()
@@ -42,16 +83,55 @@ OCR_ENGINE = "gemini"
 OCR_API_KEY = os.getenv("OCR_API_KEY")
 OCR_BASE_URL = os.getenv("OCR_BASE_URL")
 OCR_MODEL = os.getenv("OCR_MODEL", "gemini-2.5-flash")
+OCR_MAX_RETRIES = 3  # Retries on 429/5xx/connection errors, with exponential backoff
+DEFAULT_OCR_IMAGE_MAX_DIM = 1600
+
+def _read_image_max_dim() -> int:
+    """Reads OCR_IMAGE_MAX_DIM, falling back to the default for non-numeric or non-positive values."""
+    raw = os.getenv("OCR_IMAGE_MAX_DIM", str(DEFAULT_OCR_IMAGE_MAX_DIM))
+    try:
+        value = int(raw)
+    except ValueError:
+        value = 0
+    if value <= 0:
+        log.warning(f"Invalid OCR_IMAGE_MAX_DIM {raw!r}, using {DEFAULT_OCR_IMAGE_MAX_DIM}")
+        return DEFAULT_OCR_IMAGE_MAX_DIM
+    return value
+
+OCR_IMAGE_MAX_DIM = _read_image_max_dim()  # Longest image edge sent to the OCR model
 
 # Log configuration
-print(f"Base Directory: {get_base_dir()}")
-print(f"OCR API Key: {'*' * 4 + OCR_API_KEY[-4:] if OCR_API_KEY else 'Not set'}")
-print(f"OCR Base URL: {OCR_BASE_URL if OCR_BASE_URL else 'Not set'}")
-print(f"OCR Model: {OCR_MODEL}")
+log.info(f"Base Directory: {get_base_dir()}")
+log.info(f"OCR API Key: {'*' * 4 + OCR_API_KEY[-4:] if OCR_API_KEY else 'Not set'}")
+log.info(f"OCR Base URL: {OCR_BASE_URL if OCR_BASE_URL else 'Not set'}")
+log.info(f"OCR Model: {OCR_MODEL}")
+log.info(f"OCR Image Max Dimension: {OCR_IMAGE_MAX_DIM}px")
 
 # Client initialization
 gemini_client = None
 _gemini_initialized = False
+_init_lock = threading.Lock()  # Serializes client construction (warm-up vs. first capture)
+_http_client = None  # Optional shared httpx client, see set_http_client()
+
+# Markdown code fence around the model output, with an optional language tag
+_FENCE_RE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+
+# Captures whose thumbnail spans fewer grey levels than this are treated as blank and never sent to OCR.
+# The min/max range is used rather than stddev: sparse text averages down to a faint tint that barely
+# moves the stddev, but still leaves a few thumbnail cells clearly darker or lighter than the background.
+BLANK_RANGE_THRESHOLD = 8
+BLANK_THUMBNAIL_SIZE = 256
+_NO_QUESTION_RESULT = json.dumps({"question_found": False, "question": None, "choices": None})
+
+# OCR result cache keyed by image content digest (most recently used last)
+_OCR_CACHE: OrderedDict[bytes, str] = OrderedDict()
+_OCR_CACHE_SIZE = 128
+
+def set_http_client(http_client):
+    """Makes the Gemini client reuse an existing httpx connection pool.
+    Must be called before the client is first initialized."""
+    global _http_client
+    _http_client = http_client
 
 def _initialize_gemini():
     """Initializes the Gemini client using OpenAI SDK if not already done."""
@@ -61,48 +141,99 @@ def _initialize_gemini():
         return _gemini_initialized
         
     if not OCR_API_KEY or not OCR_BASE_URL:
-        print("ERROR: Cannot initialize Gemini client. Missing API Key or Base URL.")
+        log.error("Cannot initialize Gemini client. Missing API Key or Base URL.")
         return False
+    
+    with _init_lock:
+        # Another thread may have finished initializing while we waited
+        if _gemini_initialized:
+            return _gemini_initialized
         
-    print(f"Initializing Gemini client for model {OCR_MODEL}...")
-    try:
-        gemini_client = OpenAI(
-            api_key=OCR_API_KEY,
-            base_url=OCR_BASE_URL,
-        )
-        _gemini_initialized = True
-        print("Gemini client initialized.")
-    except Exception as e:
-        print(f"ERROR: Failed to initialize Gemini client: {e}")
-        gemini_client = None
-        _gemini_initialized = False
+        log.info(f"Initializing Gemini client for model {OCR_MODEL}...")
+        try:
+            # Imported on first use so loading this module stays cheap
+            from openai import OpenAI
+            gemini_client = OpenAI(
+                api_key=OCR_API_KEY,
+                base_url=OCR_BASE_URL,
+                http_client=_http_client,
+                max_retries=OCR_MAX_RETRIES
+            )
+            _gemini_initialized = True
+            log.info("Gemini client initialized.")
+        except Exception as e:
+            log.error(f"Failed to initialize Gemini client: {e}")
+            gemini_client = None
+            _gemini_initialized = False
         
     return _gemini_initialized
 
-def _pil_to_base64(image_pil: Image.Image, format="WEBP") -> str:
+def warm_up():
+    """Loads the Pillow codecs, initializes the Gemini client and opens its connection ahead of the first capture."""
+    try:
+        start_time = time.time()
+        # Pillow imports its JPEG plugin and resampling code lazily; pay that here
+        sample = Image.new("RGB", (64, 64), (255, 255, 255))
+        _is_blank(sample)
+        _pil_to_base64(_preprocess(sample).resize((32, 32), Image.Resampling.LANCZOS))
+        log.info(f"Image pipeline warmed up in {time.time() - start_time:.2f} seconds.")
+    except Exception as e:
+        log.warning(f"Image pipeline warm-up failed: {e}")
+    if not _initialize_gemini():
+        return
+    try:
+        start_time = time.time()
+        gemini_client.models.list()
+        log.info(f"Gemini connection warmed up in {time.time() - start_time:.2f} seconds.")
+    except Exception as e:
+        log.warning(f"Gemini warm-up failed (first capture will connect instead): {e}")
+
+def _preprocess(image_pil: Image.Image) -> Image.Image:
+    """Flattens transparency onto white and downscales the image so its longest edge fits OCR_IMAGE_MAX_DIM."""
+    if image_pil.mode in ("RGBA", "LA") or (image_pil.mode == "P" and "transparency" in image_pil.info):
+        rgba = image_pil.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        image_pil = background
+    elif image_pil.mode != "RGB":
+        image_pil = image_pil.convert("RGB")
+    
+    width, height = image_pil.size
+    scale = min(1.0, OCR_IMAGE_MAX_DIM / max(width, height))
+    if scale < 1.0:
+        image_pil = image_pil.resize((int(width * scale), int(height * scale)), Image.Resampling.LANCZOS)
+    return image_pil
+
+def _pil_to_base64(image_pil: Image.Image, format="JPEG") -> str:
     """Converts a PIL image to a Base64 encoded string."""
     buffered = io.BytesIO()
-    image_pil.save(buffered, format=format)
-    img_byte = buffered.getvalue()
-    img_base64 = base64.b64encode(img_byte).decode('utf-8')
+    if format == "JPEG":
+        # Single-pass baseline JPEG; optimize=True would add a second Huffman pass
+        if image_pil.mode != "RGB":
+            image_pil = image_pil.convert("RGB")
+        image_pil.save(buffered, format=format, quality=85, optimize=False)
+    else:
+        image_pil.save(buffered, format=format)
+    # getbuffer() exposes the encoded bytes without the copy getvalue() makes
+    img_base64 = base64.b64encode(buffered.getbuffer()).decode('ascii')
     return img_base64
 
 def _ocr_with_gemini(image_pil: Image.Image) -> str | None:
     """Performs OCR using Gemini via OpenAI-compatible endpoint."""
     if not _initialize_gemini():
-        print("ERROR: Gemini client not initialized.")
+        log.error("Gemini client not initialized.")
         return None
 
     if gemini_client is None:
-        print("ERROR: Gemini client is not available.")
+        log.error("Gemini client is not available.")
         return None
         
     try:
         start_time = time.time()
         
-        print("Encoding image for Gemini (WEBP)...")
-        base64_image = _pil_to_base64(image_pil, format="WEBP")
-        image_url = f"data:image/webp;base64,{base64_image}"
+        log.info(f"Encoding image for Gemini (JPEG, {image_pil.width}x{image_pil.height})...")
+        base64_image = _pil_to_base64(image_pil, format="JPEG")
+        image_url = f"data:image/jpeg;base64,{base64_image}"
         
         ocr_prompt = """
         Analyze the following image and determine if it contains a multiple-choice question (MCQ).
@@ -120,8 +251,8 @@ def _ocr_with_gemini(image_pil: Image.Image) -> str | None:
         If there are multiple questions present, only return the first one.
         """
         
-        print(f"Sending request to Gemini model: {OCR_MODEL}...")
-        response = gemini_client.chat.completions.create(
+        log.info(f"Sending request to Gemini model: {OCR_MODEL}...")
+        stream = gemini_client.chat.completions.create(
             model=OCR_MODEL,
             messages=[
                 {
@@ -135,40 +266,103 @@ def _ocr_with_gemini(image_pil: Image.Image) -> str | None:
                     ]
                 }
             ],
-            response_format={"type": "json_object"}
+            response_format={"type": "json_object"},
+            stream=True
         )
-        text = response.choices[0].message.content
+        
+        # Collect the deltas as they arrive instead of waiting for one final body
+        parts = []
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            content_chunk = chunk.choices[0].delta.content
+            if content_chunk is not None:
+                if not parts:
+                    log.info(f"Gemini OCR first token after {time.time() - start_time:.2f} seconds.")
+                parts.append(content_chunk)
+        text = "".join(parts) if parts else None
         end_time = time.time()
-        print(f"Gemini OCR completed in {end_time - start_time:.2f} seconds.")
+        log.info(f"Gemini OCR completed in {end_time - start_time:.2f} seconds.")
         
         if text is None: 
             return None  # Handle case where model returns nothing
             
         # Clean up any markdown code blocks the model might add
-        text = text.strip().removeprefix("```").removesuffix("```").strip()
-        text = text.strip().removeprefix("```text").removesuffix("```").strip()
-        text = text.strip().removeprefix("```json").removesuffix("```").strip()
-        return text
+        return _FENCE_RE.sub("", text.strip())
         
     except Exception as e:
-        print(f"Error during Gemini OCR processing: {e}")
+        log.error(f"Error during Gemini OCR processing: {e}")
         return None
 
+def _is_blank(image_pil: Image.Image) -> bool:
+    """Checks whether the image is near-uniform using the grey-level range of a small thumbnail."""
+    thumb = image_pil.resize((BLANK_THUMBNAIL_SIZE, BLANK_THUMBNAIL_SIZE), Image.Resampling.BOX).convert("L")
+    darkest, lightest = thumb.getextrema()
+    return lightest - darkest < BLANK_RANGE_THRESHOLD
+
+def _image_digest(image_pil: Image.Image) -> bytes:
+    """Returns a content digest of the image pixels, mode and size."""
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(f"{image_pil.mode}{image_pil.size}".encode())
+    hasher.update(image_pil.tobytes())
+    return hasher.digest()
+
+def parse_extraction(text: str) -> dict:
+    """
+    Parses and validates the extraction JSON returned by perform_ocr.
+    Raises json.JSONDecodeError for malformed JSON and ValueError for an invalid structure.
+    """
+    extracted_data = json.loads(text)
+    if not isinstance(extracted_data.get("question_found"), bool):
+        raise ValueError("Invalid 'question_found' field")
+    if extracted_data.get("question_found"):
+        if not isinstance(extracted_data.get("question"), str) or not isinstance(extracted_data.get("choices"), list):
+            raise ValueError("Missing or invalid 'question' or 'choices' when question_found is true")
+        if not all(isinstance(item, str) for item in extracted_data.get("choices", [])):
+            raise ValueError("Not all items in 'choices' are strings")
+    return extracted_data
+
+def _is_cacheable(result: str) -> bool:
+    """Only valid extractions that found a question are cached, so a bad or negative result can be retried."""
+    try:
+        return parse_extraction(result)["question_found"]
+    except (ValueError, AttributeError):
+        return False
+
 def perform_ocr(image_pil: Image.Image) -> str | None:
     """
     Performs OCR on the given PIL Image using Gemini Vision.
+    Results are cached by image content, so an unchanged screen skips the API call.
     """
-    print(f"--- Performing OCR using Gemini Vision API ---")
+    if _is_blank(image_pil):
+        log.info("--- Capture is blank, skipping OCR ---")
+        return _NO_QUESTION_RESULT
+    
+    # Bound the size once up front; hashing and encoding then work on the smaller image
+    image_pil = _preprocess(image_pil)
+    digest = _image_digest(image_pil)
+    cached = _OCR_CACHE.get(digest)
+    if cached is not None:
+        _OCR_CACHE.move_to_end(digest)
+        log.info("--- OCR cache hit, skipping Gemini Vision API ---")
+        return cached
+    
+    log.info("--- Performing OCR using Gemini Vision API ---")
     
     result = _ocr_with_gemini(image_pil)
     
     if result is None:
-        print(f"OCR failed with Gemini Vision API.")
+        log.warning("OCR failed with Gemini Vision API.")
+    elif _is_cacheable(result):
+        _OCR_CACHE[digest] = result
+        if len(_OCR_CACHE) > _OCR_CACHE_SIZE:
+            _OCR_CACHE.popitem(last=False)
     
     return result
 
 # Example usage (for testing ocr.py directly)
 if __name__ == "__main__":
+    start_logging()
     print(f"\nTesting OCR module with Gemini Vision API")
     
     if not OCR_API_KEY or not OCR_BASE_URL: